@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Table, text
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Table, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
@@ -43,6 +43,7 @@ class Issue(Base):
     created_at = Column(DateTime)
     started_at = Column(DateTime)  # When work began
     completed_at = Column(DateTime)
+    completion_hours = Column(Float)  # Lead time (created -> completed), stored at sync time
     cycle_id = Column(String, ForeignKey('cycles.id'))
     assignee_id = Column(String, ForeignKey('users.id'))
     team_id = Column(String)
@@ -56,6 +57,12 @@ class Issue(Base):
     blocked_periods = relationship("BlockedPeriod", back_populates="issue")
     state_changes = relationship("IssueStateChange", back_populates="issue")
 
+    __table_args__ = (
+        Index('ix_issue_cycle_completed', 'cycle_id', 'completed_at'),
+        Index('ix_issue_assignee_cycle', 'assignee_id', 'cycle_id'),
+        Index('ix_issue_completed_at', 'completed_at'),
+    )
+
 class BlockedPeriod(Base):
     __tablename__ = 'blocked_periods'
     
@@ -68,6 +75,10 @@ class BlockedPeriod(Base):
     
     issue = relationship("Issue", back_populates="blocked_periods")
 
+    __table_args__ = (
+        Index('ix_blocked_period_issue_end', 'issue_id', 'end_time'),
+    )
+
 class IssueStateChange(Base):
     __tablename__ = 'issue_state_changes'
     
@@ -91,6 +102,10 @@ class CycleCapacity(Base):
     cycle = relationship("Cycle", back_populates="capacities")
     user = relationship("User", back_populates="capacity")
 
+    __table_args__ = (
+        Index('ix_capacity_cycle_user', 'cycle_id', 'user_id', unique=True),
+    )
+
 class DailyMetrics(Base):
     __tablename__ = 'daily_metrics'
     
@@ -104,6 +119,10 @@ class DailyMetrics(Base):
     
     cycle = relationship("Cycle", back_populates="daily_metrics")
 
+    __table_args__ = (
+        Index('ix_daily_metrics_cycle_date', 'cycle_id', 'date', unique=True),
+    )
+
 class CycleMetrics(Base):
     __tablename__ = 'cycle_metrics'
     
@@ -124,6 +143,10 @@ class CycleMetrics(Base):
     project_name = Column(String)
     initiative = Column(String)
 
+    __table_args__ = (
+        Index('ix_cycle_metrics_cycle', 'cycle_id', unique=True),
+    )
+
 class UserMetrics(Base):
     __tablename__ = 'user_metrics'
     
@@ -136,6 +159,10 @@ class UserMetrics(Base):
     capacity_utilization = Column(Float)
     efficiency_ratio = Column(Float)  # Ratio of ideal to actual hours
 
+    __table_args__ = (
+        Index('ix_user_metrics_user_cycle', 'user_id', 'cycle_id', unique=True),
+    )
+
 class MonteCarloForecast(Base):
     __tablename__ = 'monte_carlo_forecasts'
     
@@ -149,6 +176,12 @@ class MonteCarloForecast(Base):
     max_completion_date = Column(DateTime)
     expected_completion_date = Column(DateTime)
 
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+    
+    team_id = Column(String, primary_key=True)
+    last_updated_at = Column(DateTime)  # Latest issue updatedAt synced for the team
+
 def init_db(db_path='data/linear_metrics.db', force_recreate=False):
     # Ensure data directory exists
     import os
@@ -156,10 +189,42 @@ def init_db(db_path='data/linear_metrics.db', force_recreate=False):
     print(f"Using database at: {os.path.abspath(db_path)}")
     
     engine = create_engine(f'sqlite:///{db_path}')
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets the dashboard read while a sync writes; NORMAL only fsyncs at checkpoints
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA cache_size=-262144')  # 256 MiB page cache
+        cursor.close()
+
     if force_recreate:
         Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
+    # create_all only builds columns and indexes along with new tables; add any missing ones
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    connection.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}'
+                    ))
+                    added.add((table.name, column.name))
+        if ('issues', 'completion_hours') in added:
+            # Lead time is stored on sync; derive it for issues synced before the column existed
+            connection.execute(text(
+                'UPDATE issues SET completion_hours = (julianday(completed_at) - julianday(created_at)) * 24 '
+                'WHERE completed_at IS NOT NULL'
+            ))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    Session = sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
     session = Session()
     
     # Test database connection
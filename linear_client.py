@@ -1,32 +1,289 @@
 import os
-from datetime import datetime, timedelta
+import re
+import asyncio
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime
 from typing import Dict, List
 from dotenv import load_dotenv
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
+import orjson
+from ciso8601 import parse_datetime
+from graphql import parse
+from graphql.language import FieldNode, InlineFragmentNode, IntValueNode, VariableNode
 from database import (
     init_db, User, Cycle, Issue, CycleCapacity, CycleMetrics, UserMetrics,
-    BlockedPeriod, IssueStateChange, DailyMetrics
+    BlockedPeriod, IssueStateChange, DailyMetrics, SyncState
 )
+from sqlalchemy import select, func, case, literal, text, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 import pandas as pd
 
+logger = logging.getLogger(__name__)
+
+# Linear rejects queries whose estimated complexity exceeds 10,000 points
+MAX_COMPLEXITY = 10_000
+
+# Maximum number of concurrent in-flight requests against the Linear API
+MAX_CONCURRENT_REQUESTS = 8
+
+# Number of teams combined into one aliased query (reduced if over MAX_COMPLEXITY)
+TEAM_BATCH_SIZE = 10
+
+# Issues updated before this are never fetched (matches the createdAt filter below)
+SYNC_START = '2024-01-01T00:00:00.000Z'
+
+# Retries (with exponential backoff from RETRY_BACKOFF seconds) for throttled or failed requests
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Responses to a JSON array batch that mean the API doesn't support batching
+BATCH_UNSUPPORTED_STATUSES = (400, 404, 405, 415)
+
+# Rows per executemany when upserting into the local database
+UPSERT_CHUNK_SIZE = 1000
+
+# Issue fields needed by the metric calculations; columns missing from the rows
+# are left untouched by the upsert so a metric-only sync doesn't clobber a full one.
+_METRIC_ISSUE_FIELDS = """
+                id
+                estimate
+                createdAt
+                updatedAt
+                startedAt
+                completedAt
+                cycle {
+                    id
+                }
+                assignee {
+                    id
+                }"""
+
+_FULL_ISSUE_FIELDS = _METRIC_ISSUE_FIELDS + """
+                title
+                state {
+                    name
+                }
+                priority"""
+
+_ISSUES_SELECTION = """
+        issues(
+            first: $first,
+            after: $after,
+            filter: {
+                createdAt: { gte: "2024-01-01" }
+                updatedAt: { gte: $since }
+            }
+        ) {
+            nodes {%s
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }"""
+
+_ISSUES_QUERY = """
+query($teamId: String!, $after: String, $first: Int!, $since: DateTimeOrDuration!) {
+    team(id: $teamId) {%s
+    }
+}
+"""
+
+_metric_issue_selection = _ISSUES_SELECTION % _METRIC_ISSUE_FIELDS
+_full_issue_selection = _ISSUES_SELECTION % _FULL_ISSUE_FIELDS
+_metric_issue_query = _ISSUES_QUERY % _metric_issue_selection
+_full_issue_query = _ISSUES_QUERY % _full_issue_selection
+
+
+_DAILY_METRICS_UPSERT = text("""
+WITH RECURSIVE days(cycle_id, day, last_day) AS (
+    SELECT id, julianday(start_date), MIN(julianday(end_date), julianday(:now))
+    FROM cycles
+    WHERE julianday(start_date) <= MIN(julianday(end_date), julianday(:now))
+    UNION ALL
+    SELECT cycle_id, day + 1, last_day
+    FROM days
+    WHERE day + 1 <= last_day
+)
+INSERT INTO daily_metrics (cycle_id, date, remaining_hours, completed_points, wip_count, blocked_items)
+SELECT
+    d.cycle_id,
+    strftime('%Y-%m-%d %H:%M:%f', d.day) || '000',
+    COALESCE(SUM(CASE WHEN i.completed_at IS NULL OR julianday(i.completed_at) > d.day
+                      THEN COALESCE(i.ideal_hours, 0) ELSE 0 END), 0),
+    COALESCE(SUM(CASE WHEN date(i.completed_at) <= date(d.day)
+                      THEN COALESCE(i.estimate, 0) ELSE 0 END), 0),
+    COUNT(CASE WHEN julianday(i.started_at) <= d.day
+                    AND (i.completed_at IS NULL OR julianday(i.completed_at) > d.day) THEN 1 END),
+    COUNT(CASE WHEN EXISTS (
+        SELECT 1 FROM blocked_periods b
+        WHERE b.issue_id = i.id
+          AND julianday(b.start_time) <= d.day
+          AND (b.end_time IS NULL OR julianday(b.end_time) > d.day)
+    ) THEN 1 END)
+FROM days d
+LEFT JOIN issues i ON i.cycle_id = d.cycle_id
+GROUP BY d.cycle_id, d.day
+ON CONFLICT (cycle_id, date) DO UPDATE SET
+    remaining_hours = excluded.remaining_hours,
+    completed_points = excluded.completed_points,
+    wip_count = excluded.wip_count,
+    blocked_items = excluded.blocked_items
+""")
+
+
+@lru_cache(maxsize=None)
+def _upsert_statement(table, key_cols: tuple, columns: tuple):
+    """Build (once per table/column set) an upsert updating the non-key columns"""
+    stmt = sqlite_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(key_cols),
+        set_={col: stmt.excluded[col] for col in columns if col not in key_cols}
+    )
+
+
+# (cycle_id, user_id) is unique; pairs that already have a capacity are left as they are
+_CAPACITY_INSERT = sqlite_insert(CycleCapacity.__table__).on_conflict_do_nothing(
+    index_elements=['cycle_id', 'user_id']
+)
+
+
+def _team_batch_query(selection: str, count: int, variable_definitions: str = '',
+                      team_variable_definitions: Dict[str, str] = None) -> str:
+    """Build one query running `selection` for `count` teams aliased team0..teamN
+
+    Variables in `team_variable_definitions` (name -> type) get one copy per team,
+    $name0..$nameN, so each alias can be passed its own value.
+    """
+    team_variable_definitions = team_variable_definitions or {}
+    definitions = [f'$t{i}: String!' for i in range(count)]
+    definitions += [f'${name}{i}: {type_}' for i in range(count) for name, type_ in team_variable_definitions.items()]
+    if variable_definitions:
+        definitions.append(variable_definitions)
+    teams = ''
+    for i in range(count):
+        team_selection = selection
+        for name in team_variable_definitions:
+            team_selection = re.sub(rf'\${name}\b', f'${name}{i}', team_selection)
+        teams += f'\n    team{i}: team(id: $t{i}) {{{team_selection}\n    }}'
+    return f'query({", ".join(definitions)}) {{{teams}\n}}'
+
+
+def _format_ts(value: datetime) -> str:
+    """Format a stored timestamp the way the API returns them"""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+@lru_cache(maxsize=4096)
+def _parse_ts(value: str):
+    """Parse an API timestamp (None-safe); repeated values are served from the cache"""
+    return parse_datetime(value) if value else None
+
+
+@lru_cache(maxsize=64)
+def _parse_query(query: str):
+    return parse(query)
+
+
+def _selection_complexity(selection_set, variables: Dict) -> float:
+    """Sum field costs, multiplying nested selections by their page size"""
+    total = 0.0
+    for selection in selection_set.selections:
+        if isinstance(selection, InlineFragmentNode):
+            total += _selection_complexity(selection.selection_set, variables)
+        elif isinstance(selection, FieldNode):
+            if selection.selection_set is None:
+                total += 0.1  # Scalar property
+                continue
+            multiplier = 1
+            for argument in selection.arguments:
+                if argument.name.value not in ('first', 'last'):
+                    continue
+                if isinstance(argument.value, IntValueNode):
+                    multiplier = int(argument.value.value)
+                elif isinstance(argument.value, VariableNode):
+                    multiplier = int(variables.get(argument.value.name.value) or 1)
+            total += 1 + multiplier * _selection_complexity(selection.selection_set, variables)
+    return total
+
+
+class QueryComplexityError(ValueError):
+    """A query's estimated complexity is over MAX_COMPLEXITY"""
+
+
+def _team_data(result: Dict, key: str, team: Dict):
+    """Pick one team's data out of a response, or an exception if its query failed"""
+    data = (result.get('data') or {}).get(key)
+    if data is None:
+        return Exception(f"Query for team {team['id']} failed: {result.get('errors')}")
+    return data
+
+
+def _estimate_complexity(query: str, variables: Dict = None) -> float:
+    """Statically estimate the complexity Linear will charge for a query"""
+    document = _parse_query(query)
+    return sum(
+        _selection_complexity(definition.selection_set, variables or {})
+        for definition in document.definitions
+        if getattr(definition, 'selection_set', None) is not None
+    )
+
+
+def _page_size(query: str, variables: Dict, page_variable: str, requested: int) -> int:
+    """Largest page size up to `requested` that keeps the query under MAX_COMPLEXITY"""
+    size = requested
+    while size > 1 and _estimate_complexity(query, {**variables, page_variable: size}) > MAX_COMPLEXITY:
+        size //= 2
+    return size
+
 class LinearMetricsClient:
-    def __init__(self):
+    def __init__(self, array_batching: bool = False):
         load_dotenv()
         self.api_key = os.getenv('LINEAR_KEY')  # Match the case with docker-compose.yml
-        print(f"Loaded API key: {self.api_key}")  # Debug print
+        logger.debug("Loaded API key: %s", 'yes' if self.api_key else 'no')
         self.headers = {
-            'Authorization': self.api_key,
             'Content-Type': 'application/json',
         }
+        # httpx rejects a None header value; without a key the API answers 401
+        if self.api_key:
+            self.headers['Authorization'] = self.api_key
         self.api_url = 'https://api.linear.app/graphql'
+        # Blocking session for test_connection only (manual/CLI checks); syncs use the
+        # async client, which retries in _post_async
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Queries are read-only, so POSTs are retried on throttling and server errors too
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(total=MAX_RETRIES, backoff_factor=RETRY_BACKOFF,
+                              status_forcelist=list(RETRY_STATUSES), allowed_methods=None)
+        ))
+        self._async_client = None
+        self._semaphore = None
+        self._loop = None
+        self._in_sync = False
+        # Whether to send JSON array batches: off unless requested, since every new
+        # client would otherwise probe it again (None = try it, then remember)
+        self._array_batching = None if array_batching else False
         print("Initializing database...")
         self.db = init_db(force_recreate=False)  # Don't recreate DB on every run
         print("Database initialized")
 
     def test_connection(self):
-        """Test the API connection with a simple viewer query"""
+        """Test the API connection with a simple viewer query
+
+        For manual and CLI use: sync_data checks the connection itself in
+        sync_users. This is the only caller of the blocking requests session
+        and its retrying HTTPAdapter.
+        """
         query = """
         query {
             viewer {
@@ -37,56 +294,232 @@ class LinearMetricsClient:
         }
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                headers=self.headers,
-                json={'query': query}
+                data=orjson.dumps({'query': query})
             )
-            print(f"Response status: {response.status_code}")
-            print(f"Response content: {response.text}")
+            logger.debug("Response status: %d", response.status_code)
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
             print(f"Connected as: {result['data']['viewer']['name']}")
             return True
         except Exception as e:
             print(f"Connection test failed: {str(e)}")
             return False
 
-    def _execute_query(self, query: str, variables: Dict = None) -> Dict:
-        """Execute a GraphQL query against Linear API"""
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json={'query': query, 'variables': variables or {}}
-            )
+    async def __aenter__(self):
+        # HTTP/2 multiplexes the concurrent queries over one TLS connection
+        self._async_client = httpx.AsyncClient(
+            http2=True,
+            headers={**self.headers, 'Accept-Encoding': 'gzip, br'},
+            limits=httpx.Limits(max_connections=20)
+        )
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._async_client.aclose()
+        self._async_client = None
+        self._semaphore = None
+
+    async def _post_async(self, content: bytes) -> httpx.Response:
+        """POST to the API, retrying throttled, failed and dropped requests with backoff"""
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await self._async_client.post(self.api_url, content=content)
+            except httpx.TransportError:
+                if attempt == MAX_RETRIES:
+                    raise
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES):
+                return response
+            delay = RETRY_BACKOFF * 2 ** attempt
+            retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+            if retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            logger.debug("Retrying API request in %.1fs", delay)
+            await asyncio.sleep(delay)
+
+    async def _execute_query_async(self, query: str, variables: Dict = None) -> Dict:
+        """Execute a GraphQL query on the shared async HTTP client"""
+        complexity = _estimate_complexity(query, variables)
+        if complexity > MAX_COMPLEXITY:
+            raise QueryComplexityError(f"Query complexity {complexity:.0f} exceeds limit of {MAX_COMPLEXITY}")
+        response = await self._post_async(orjson.dumps({'query': query, 'variables': variables or {}}))
+        logger.debug("Query response length=%d", len(response.content))
+        if response.is_error:
+            logger.error("Error response from API: %s", response.text)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            print(f"Error response from API: {response.text}")
-            raise
+        return orjson.loads(response.content)
 
-    def sync_data(self):
-        """Synchronize all data from Linear to local database"""
-        if not self.test_connection():
-            raise Exception("Failed to connect to Linear API")
-        
+    async def _execute_batch_async(self, ops: List) -> List[Dict]:
+        """Send several (query, variables) operations as one JSON array request
+
+        Raises ValueError if the server does not answer with one result per operation,
+        and QueryComplexityError (a ValueError) if an operation is over the complexity limit.
+        """
+        for query, variables in ops:
+            complexity = _estimate_complexity(query, variables)
+            if complexity > MAX_COMPLEXITY:
+                raise QueryComplexityError(f"Query complexity {complexity:.0f} exceeds limit of {MAX_COMPLEXITY}")
+        response = await self._post_async(
+            orjson.dumps([{'query': query, 'variables': variables or {}} for query, variables in ops])
+        )
+        logger.debug("Batch response length=%d", len(response.content))
+        response.raise_for_status()
+        results = orjson.loads(response.content)
+        if not isinstance(results, list) or len(results) != len(ops):
+            raise ValueError("API did not return one result per batched operation")
+        return results
+
+    async def _execute_team_batches(self, selection: str, teams: List[Dict],
+                                    variables: Dict = None, variable_definitions: str = '',
+                                    team_query: str = None, team_variables: Dict[str, Dict] = None,
+                                    team_variable_definitions: Dict[str, str] = None) -> List:
+        """Run `selection` for every team, batching TEAM_BATCH_SIZE teams per request
+
+        `team_variables` maps a team id to variables that differ per team; their
+        types are given in `team_variable_definitions`.
+
+        If `team_query` (the same selection under `team(id: $teamId)`) is given and the
+        client was created with array_batching=True, the teams are first sent as JSON
+        array batches; when the API rejects those, the client remembers it and uses
+        aliased team queries instead.
+
+        Returns one entry per team: its `team` data, or the exception raised by its batch.
+        """
+        variables = variables or {}
+        team_variables = team_variables or {}
+        if team_query and self._array_batching is not False:
+            batches = [teams[i:i + TEAM_BATCH_SIZE] for i in range(0, len(teams), TEAM_BATCH_SIZE)]
+            try:
+                results = await asyncio.gather(*[
+                    self._execute_batch_async([
+                        (team_query, {**variables, **team_variables.get(team['id'], {}), 'teamId': team['id']})
+                        for team in batch
+                    ])
+                    for batch in batches
+                ])
+                self._array_batching = True
+                return [_team_data(result, 'team', team)
+                        for batch, batch_results in zip(batches, results)
+                        for team, result in zip(batch, batch_results)]
+            except QueryComplexityError:
+                raise
+            except (ValueError, httpx.HTTPStatusError) as e:
+                # Auth and throttling errors aren't about batching; let them through
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in BATCH_UNSUPPORTED_STATUSES:
+                    raise
+                logger.debug("Array batching unavailable, using aliased queries: %s", e)
+                self._array_batching = False
+
+        batch_size = TEAM_BATCH_SIZE
+        while batch_size > 1 and _estimate_complexity(
+                _team_batch_query(selection, batch_size, variable_definitions, team_variable_definitions),
+                variables) > MAX_COMPLEXITY:
+            batch_size -= 1
+        batches = [teams[i:i + batch_size] for i in range(0, len(teams), batch_size)]
+        results = await asyncio.gather(*[
+            self._execute_query_async(
+                _team_batch_query(selection, len(batch), variable_definitions, team_variable_definitions),
+                {**variables,
+                 **{f't{i}': team['id'] for i, team in enumerate(batch)},
+                 **{f'{name}{i}': value for i, team in enumerate(batch)
+                    for name, value in team_variables.get(team['id'], {}).items()}}
+            )
+            for batch in batches
+        ], return_exceptions=True)
+
+        team_data = []
+        for batch, result in zip(batches, results):
+            for i, team in enumerate(batch):
+                team_data.append(result if isinstance(result, Exception) else _team_data(result, f'team{i}', team))
+        return team_data
+
+    def _run_async(self, fetch):
+        """Run the coroutine returned by fetch() with an open HTTP session
+
+        Inside sync_data the session's event loop and client are reused;
+        otherwise a short-lived session is opened for this call.
+        """
+        if self._loop is not None:
+            return self._loop.run_until_complete(fetch())
+
+        async def runner():
+            async with self:
+                return await fetch()
+        return asyncio.run(runner())
+
+    @contextmanager
+    def _async_session(self):
+        """Keep one event loop and AsyncClient open for a whole sync"""
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self.__aenter__())
+        self._loop = loop
+        try:
+            yield
+        finally:
+            self._loop = None
+            try:
+                loop.run_until_complete(self.__aexit__(None, None, None))
+            finally:
+                loop.close()
+
+    def _bulk_upsert(self, model, rows: List[Dict], key_cols: List[str]):
+        """Insert rows in executemany chunks, updating non-key columns on conflict"""
+        if not rows:
+            return
+        stmt = _upsert_statement(model.__table__, tuple(key_cols), tuple(rows[0]))
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            self.db.execute(stmt, rows[start:start + UPSERT_CHUNK_SIZE])
+
+    def _commit_step(self):
+        """Commit a sync step run on its own; within sync_data everything commits once"""
+        if not self._in_sync:
+            self.db.commit()
+
+    def sync_data(self, full: bool = False):
+        """Synchronize all data from Linear to local database
+
+        full=True is passed on to sync_issues (all issues, with title, state and priority).
+        """
         print("Syncing data from Linear...")
         try:
-            self.sync_users()
-            self.sync_cycles()
-            self.sync_issues()
-            self.sync_daily_metrics()
+            # The sync steps only write; the whole load is committed once below
+            self._in_sync = True
+            try:
+                # All API calls of the sync share one HTTP/2 connection
+                with self._async_session():
+                    self.sync_users()
+                    teams = self.sync_cycles()
+                    self.sync_issues(full=full, teams=teams)
+                self.sync_daily_metrics()
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            finally:
+                self._in_sync = False
             self.calculate_metrics()
         except Exception as e:
             print(f"Error syncing data: {str(e)}")
             raise
 
     def sync_users(self):
-        """Fetch and store team members"""
+        """Fetch and store team members
+
+        The viewer is fetched in the same request and doubles as the connection check.
+        """
+        if not self.api_key:
+            raise Exception("Failed to connect to Linear API, please check your API key: LINEAR_KEY is not set")
         query = """
         query {
-            users(first: 100) {
+            viewer {
+                id
+                name
+            }
+            users(first: 250) {
                 nodes {
                     id
                     name
@@ -95,37 +528,39 @@ class LinearMetricsClient:
             }
         }
         """
-        result = self._execute_query(query)
+        result = self._run_async(lambda: self._execute_query_async(query))
+        viewer = (result.get('data') or {}).get('viewer')
+        if not viewer or not viewer.get('id'):
+            raise Exception(f"Failed to connect to Linear API, please check your API key: {result.get('errors')}")
+        print(f"Connected as: {viewer['name']}")
         users = result['data']['users']['nodes']
         
-        for user_data in users:
-            db_user = User(
-                id=user_data['id'],
-                name=user_data['name'],
-                email=user_data['email']
-            )
-            self.db.merge(db_user)
-        self.db.commit()
+        self._bulk_upsert(User, [{
+            'id': user_data['id'],
+            'name': user_data['name'],
+            'email': user_data['email']
+        } for user_data in users], ['id'])
+        self._commit_step()
+
+    def sync_cycles(self) -> List[Dict]:
+        """Fetch and store cycles (sprints)
 
-    def sync_cycles(self):
-        """Fetch and store cycles (sprints)"""
-        teams_query = """
+        Returns the id/name list of teams whose issues are synced, fetched in the
+        same request so sync_issues doesn't have to query it again.
+        """
+        # Teams, their cycles and their memberships in a single nested query
+        query = """
         query {
-            teams(first: 10) {
+            issueTeams: teams(first: 50) {
                 nodes {
                     id
                     name
                 }
             }
-        }
-        """
-        teams_result = self._execute_query(teams_query)
-        teams = teams_result['data']['teams']['nodes']
-        
-        for team in teams:
-            cycles_query = """
-            query($teamId: String!) {
-                team(id: $teamId) {
+            teams(first: 10) {
+                nodes {
+                    id
+                    name
                     cycles(first: 10) {
                         nodes {
                             id
@@ -136,279 +571,246 @@ class LinearMetricsClient:
                             progress
                         }
                     }
+                    memberships(first: 250) {
+                        nodes {
+                            user {
+                                id
+                            }
+                        }
+                    }
                 }
             }
-            """
-            try:
-                cycles_result = self._execute_query(cycles_query, {'teamId': team['id']})
-                cycles = cycles_result['data']['team']['cycles']['nodes']
-                print(f"Found {len(cycles)} cycles for team {team['id']}")
-                
-                # First pass: Create all cycles
-                for cycle_data in cycles:
-                    db_cycle = Cycle(
-                        id=cycle_data['id'],
-                        number=cycle_data['number'],
-                        name=cycle_data['name'],
-                        start_date=datetime.fromisoformat(cycle_data['startsAt'].replace('Z', '+00:00')),
-                        end_date=datetime.fromisoformat(cycle_data['endsAt'].replace('Z', '+00:00')),
-                        progress=cycle_data['progress'],
-                        max_wip=5,  # Default WIP limit, adjust as needed
-                        team_id=team['id'],
-                        team_name=team['name']
-                    )
-                    self.db.merge(db_cycle)
-                
-                # Commit cycles for this team before moving to the next
-                self.db.commit()
-                print(f"Saved cycles for team {team['name']}")
-                
-                # Verify cycles were saved
-                saved_cycles = self.db.query(Cycle).filter(Cycle.team_id == team['id']).all()
-                print(f"Verified {len(saved_cycles)} cycles saved for team {team['name']}")
-            except Exception as e:
-                print(f"Error processing cycles for team {team['id']}: {str(e)}")
-                continue
+        }
+        """
+        result = self._run_async(lambda: self._execute_query_async(query))
+        teams = result['data']['teams']['nodes']
 
-        # Set default capacities for team members
+        cycle_rows = []
+        capacity_rows = []
         for team in teams:
             try:
-                members_query = """
-                query($teamId: String!) {
-                    team(id: $teamId) {
-                        memberships(first: 50) {
-                            nodes {
-                                user {
-                                    id
-                                }
-                            }
-                        }
-                    }
-                }
-                """
-                members_result = self._execute_query(members_query, {'teamId': team['id']})
-                members = members_result['data']['team']['memberships']['nodes']
-                print(f"Found {len(members)} members for team {team['name']}")
-                
-                # Get cycles for this team from the database
-                cycles = self.db.query(Cycle).filter(Cycle.team_id == team['id']).all()
-                print(f"Setting capacities for {len(cycles)} cycles in team {team['name']}")
-                
-                for cycle in cycles:
-                    for member in members:
-                        try:
-                            capacity = CycleCapacity(
-                                cycle_id=cycle.id,
-                                user_id=member['user']['id'],
-                                capacity_hours=32.0,  # Default to 32 productive hours/week (80% of 40)
-                                capacity_points=10.0  # Default story point capacity
-                            )
-                            self.db.merge(capacity)
-                        except Exception as e:
-                            print(f"Error setting capacity for user {member['user']['id']} in cycle {cycle.id}: {str(e)}")
-                            continue
-                    self.db.commit()
-                print(f"Finished setting capacities for team {team['name']}")
+                cycles = team['cycles']['nodes']
+                members = team['memberships']['nodes']
+                print(f"Found {len(cycles)} cycles and {len(members)} members for team {team['name']}")
+
+                for cycle_data in cycles:
+                    cycle_rows.append({
+                        'id': cycle_data['id'],
+                        'number': cycle_data['number'],
+                        'name': cycle_data['name'],
+                        'start_date': _parse_ts(cycle_data['startsAt']),
+                        'end_date': _parse_ts(cycle_data['endsAt']),
+                        'progress': cycle_data['progress'],
+                        'max_wip': 5,  # Default WIP limit, adjust as needed
+                        'team_id': team['id'],
+                        'team_name': team['name']
+                    })
+
+                # Set default capacities for team members
+                capacity_rows.extend({
+                    'cycle_id': cycle_data['id'],
+                    'user_id': member['user']['id'],
+                    'capacity_hours': 32.0,  # Default to 32 productive hours/week (80% of 40)
+                    'capacity_points': 10.0  # Default story point capacity
+                } for cycle_data in cycles for member in members)
             except Exception as e:
                 print(f"Error processing team {team['id']}: {str(e)}")
                 continue
 
-    def sync_issues(self):
-        """Fetch and store issues with detailed history"""
+        self._bulk_upsert(Cycle, cycle_rows, ['id'])
+        if capacity_rows:
+            self.db.execute(_CAPACITY_INSERT, capacity_rows)
+        self._commit_step()
+        return result['data']['issueTeams']['nodes']
+
+    async def _fetch_team_issues(self, team: Dict, issues_query: str, page_size: int, since: str,
+                                 first_page) -> List[Dict]:
+        """Walk the remaining issue pages for one team, starting from its batched first page"""
+        if isinstance(first_page, Exception):
+            raise first_page
+        connection = first_page['issues']
+        issues = list(connection['nodes'])
+        while connection['pageInfo']['hasNextPage']:
+            issues_result = await self._execute_query_async(
+                issues_query,
+                {'teamId': team['id'], 'after': connection['pageInfo']['endCursor'], 'first': page_size,
+                 'since': since}
+            )
+            connection = issues_result['data']['team']['issues']
+            issues.extend(connection['nodes'])
+        return issues
+
+    def sync_issues(self, full: bool = False, teams: List[Dict] = None):
+        """Fetch and store issues with detailed history
+
+        By default only the fields needed for metrics are requested, and only
+        issues updated since the team's last sync are fetched; pass full=True to
+        fetch every issue with title, state and priority as well. `teams` is the
+        id/name list returned by sync_cycles; it is queried if not given.
+        """
         try:
-            teams_query = """
-            query {
-                teams(first: 50) {
-                    nodes {
-                        id
-                        name
-                    }
-                }
-            }
-            """
-            teams_result = self._execute_query(teams_query)
-            teams = teams_result['data']['teams']['nodes']
-            
-            for team in teams:
-                issues_query = """
-                query($teamId: String!, $after: String) {
-                    team(id: $teamId) {
-                        issues(
-                            first: 20,
-                            after: $after,
-                            filter: {
-                                createdAt: { gte: "2024-01-01" }
-                            }
-                        ) {
-                            nodes {
-                                id
-                                title
-                                state {
-                                    name
-                                    type
-                                }
-                                priority
-                                estimate
-                                createdAt
-                                startedAt
-                                completedAt
-                                cycle {
-                                    id
-                                }
-                                assignee {
-                                    id
-                                }
-                            }
-                            pageInfo {
-                                hasNextPage
-                                endCursor
-                            }
+            if teams is None:
+                teams_query = """
+                query {
+                    teams(first: 50) {
+                        nodes {
+                            id
+                            name
                         }
                     }
                 }
                 """
-                after = None
-                while True:
-                    issues_result = self._execute_query(issues_query, {'teamId': team['id'], 'after': after})
-                    issues = issues_result['data']['team']['issues']['nodes']
-                    page_info = issues_result['data']['team']['issues']['pageInfo']
-                    
-                    for issue_data in issues:
-                        # Check if cycle exists before creating issue
-                        cycle_id = issue_data['cycle']['id'] if issue_data['cycle'] else None
-                        if cycle_id:
-                            cycle = self.db.query(Cycle).filter(Cycle.id == cycle_id).first()
-                            if not cycle:
-                                print(f"Skipping issue {issue_data['id']} - cycle {cycle_id} not found")
-                                continue
-
-                        db_issue = Issue(
-                            id=issue_data['id'],
-                            title=issue_data['title'],
-                            description='',  # We'll fetch this separately if needed
-                            state=issue_data['state']['name'],
-                            priority=issue_data['priority'],
-                            estimate=issue_data['estimate'],
-                            ideal_hours=0.0,
-                            actual_hours=0.0,
-                            created_at=datetime.fromisoformat(issue_data['createdAt'].replace('Z', '+00:00')),
-                            started_at=datetime.fromisoformat(issue_data['startedAt'].replace('Z', '+00:00')) if issue_data['startedAt'] else None,
-                            completed_at=datetime.fromisoformat(issue_data['completedAt'].replace('Z', '+00:00')) if issue_data['completedAt'] else None,
-                            cycle_id=cycle_id,
-                            assignee_id=issue_data['assignee']['id'] if issue_data['assignee'] else None,
-                            team_id=team['id'],
-                            team_name=team['name'],
-                            project_id=None,  # We'll fetch this separately if needed
-                            project_name=None,
-                            initiative=None  # We'll fetch this separately if needed
-                        )
-                        self.db.merge(db_issue)
-                    
-                    self.db.commit()
-                    
-                    if not page_info['hasNextPage']:
-                        break
-                        
-                    after = page_info['endCursor']
+                teams_result = self._run_async(lambda: self._execute_query_async(teams_query))
+                teams = teams_result['data']['teams']['nodes']
+            issues_query = _full_issue_query if full else _metric_issue_query
+            issues_selection = _full_issue_selection if full else _metric_issue_selection
+            page_size = _page_size(issues_query, {}, 'first', 250)
+            synced_until = {} if full else dict(self.db.query(SyncState.team_id, SyncState.last_updated_at))
+            since = {
+                team['id']: _format_ts(synced_until[team['id']]) if synced_until.get(team['id']) else SYNC_START
+                for team in teams
+            }
+
+            # First pages are fetched in aliased team batches; the remaining pages
+            # are walked concurrently per team following the cursor
+            async def fetch():
+                first_pages = await self._execute_team_batches(
+                    issues_selection, teams, {'first': page_size, 'after': None},
+                    '$first: Int!, $after: String', issues_query,
+                    {team_id: {'since': value} for team_id, value in since.items()},
+                    {'since': 'DateTimeOrDuration!'}
+                )
+                return await asyncio.gather(*[
+                    self._fetch_team_issues(team, issues_query, page_size, since[team['id']], first_page)
+                    for team, first_page in zip(teams, first_pages)
+                ])
+            team_issues = self._run_async(fetch)
+
+            cursors = []
+            for team, issues in zip(teams, team_issues):
+                issue_rows = []
+                for issue_data in issues:
+                    # Issues in cycles that aren't synced (older cycles, or teams beyond
+                    # sync_cycles' page) are stored too; the metric queries join on cycles,
+                    # so they only count once their cycle is synced.
+                    cycle_id = issue_data['cycle']['id'] if issue_data['cycle'] else None
+
+                    created_at = _parse_ts(issue_data['createdAt'])
+                    completed_at = _parse_ts(issue_data['completedAt'])
+                    issue_row = {
+                        'id': issue_data['id'],
+                        'estimate': issue_data['estimate'],
+                        'ideal_hours': 0.0,
+                        'actual_hours': 0.0,
+                        'created_at': created_at,
+                        'started_at': _parse_ts(issue_data['startedAt']),
+                        'completed_at': completed_at,
+                        'completion_hours': (completed_at - created_at).total_seconds() / 3600 if completed_at else None,
+                        'cycle_id': cycle_id,
+                        'assignee_id': issue_data['assignee']['id'] if issue_data['assignee'] else None,
+                        'team_id': team['id'],
+                        'team_name': team['name'],
+                        'project_id': None,  # We'll fetch this separately if needed
+                        'project_name': None,
+                        'initiative': None  # We'll fetch this separately if needed
+                    }
+                    if full:
+                        issue_row['title'] = issue_data['title']
+                        issue_row['description'] = ''  # We'll fetch this separately if needed
+                        issue_row['state'] = issue_data['state']['name']
+                        issue_row['priority'] = issue_data['priority']
+                    issue_rows.append(issue_row)
+                self._bulk_upsert(Issue, issue_rows, ['id'])
+
+                # Every fetched issue is stored, so the cursor moves to the newest one
+                if issues:
+                    cursors.append({
+                        'team_id': team['id'],
+                        'last_updated_at': _parse_ts(max(issue['updatedAt'] for issue in issues))
+                    })
+
+            # Committed together with the issues
+            self._bulk_upsert(SyncState, cursors, ['team_id'])
+            self._commit_step()
         except Exception as e:
             print(f"Error syncing issues: {str(e)}")
             raise
 
     def sync_daily_metrics(self):
         """Calculate and store daily metrics for active cycles"""
-        cycles = self.db.query(Cycle).all()
-        
-        for cycle in cycles:
-            current_date = cycle.start_date
-            while current_date <= min(cycle.end_date, datetime.now()):
-                # Calculate metrics for this day
-                issues = cycle.issues
-                
-                # WIP count - issues in progress on this day
-                wip_count = len([i for i in issues if 
-                    i.started_at and i.started_at <= current_date and 
-                    (not i.completed_at or i.completed_at > current_date)])
-                
-                # Blocked items count
-                blocked_count = len([i for i in issues if any(
-                    b.start_time <= current_date and (not b.end_time or b.end_time > current_date)
-                    for b in i.blocked_periods)])
-                
-                # Completed points up to this day
-                completed_points = sum(i.estimate or 0 for i in issues if 
-                    i.completed_at and i.completed_at.date() <= current_date.date())
-                
-                # Remaining hours
-                remaining_hours = sum(i.ideal_hours or 0 for i in issues if 
-                    not i.completed_at or i.completed_at > current_date)
-                
-                daily_metrics = DailyMetrics(
-                    cycle_id=cycle.id,
-                    date=current_date,
-                    remaining_hours=remaining_hours,
-                    completed_points=completed_points,
-                    wip_count=wip_count,
-                    blocked_items=blocked_count
-                )
-                self.db.merge(daily_metrics)
-                
-                current_date += timedelta(days=1)
-        
-        self.db.commit()
+        # One row per (cycle, day) from the cycle start until its end (or now),
+        # aggregated over the cycle's issues entirely inside the database
+        self.db.execute(_DAILY_METRICS_UPSERT, {'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')})
+        self._commit_step()
 
     def calculate_metrics(self):
         """Calculate and store metrics for cycles and users"""
-        self._calculate_cycle_metrics()
-        self._calculate_user_metrics()
+        try:
+            self._calculate_cycle_metrics()
+            self._calculate_user_metrics()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
 
     def _calculate_cycle_metrics(self):
         """Calculate comprehensive metrics for each cycle"""
         try:
-            cycles = self.db.query(Cycle).all()
-            for cycle in cycles:
-                issues = cycle.issues
-                completed_issues = [i for i in issues if i.completed_at]
-                
-                total_points = sum(i.estimate or 0 for i in issues)
-                completed_points = sum(i.estimate or 0 for i in completed_issues)
-                
-                # Calculate average cycle and lead times
-                cycle_times = []
-                lead_times = []
-                blocked_times = []
-                
-                for issue in completed_issues:
-                    if issue.started_at and issue.completed_at:
-                        cycle_times.append((issue.completed_at - issue.started_at).total_seconds() / 3600)
-                    if issue.created_at and issue.completed_at:
-                        lead_times.append((issue.completed_at - issue.created_at).total_seconds() / 3600)
-                    
-                    # Calculate total blocked time
-                    blocked_time = sum(
-                        ((b.end_time or datetime.now()) - b.start_time).total_seconds() / 3600
-                        for b in issue.blocked_periods
-                    )
-                    blocked_times.append(blocked_time)
-                
-                metrics = CycleMetrics(
-                    cycle_id=cycle.id,
-                    total_story_points=total_points,
-                    completed_story_points=completed_points,
-                    avg_cycle_time=sum(cycle_times) / len(cycle_times) if cycle_times else 0,
-                    avg_lead_time=sum(lead_times) / len(lead_times) if lead_times else 0,
-                    throughput=len(completed_issues),
-                    velocity=completed_points,
-                    avg_blocked_time=sum(blocked_times) / len(blocked_times) if blocked_times else 0,
-                    start_date=cycle.start_date,
-                    end_date=cycle.end_date,
-                    team_id=cycle.team_id if hasattr(cycle, 'team_id') else None,
-                    team_name=cycle.team_name if hasattr(cycle, 'team_name') else None,
-                    project_id=None,
-                    project_name=None,
-                    initiative=None
+            completed = Issue.completed_at.isnot(None)
+            points = func.coalesce(Issue.estimate, 0)
+            completed_points = func.coalesce(func.sum(case((completed, points), else_=0)), 0)
+
+            # Total blocked hours per issue; open periods count up to now
+            blocked = (
+                select(
+                    BlockedPeriod.issue_id,
+                    func.sum(
+                        (func.julianday(func.coalesce(BlockedPeriod.end_time, literal(datetime.now(), DateTime)))
+                         - func.julianday(BlockedPeriod.start_time)) * 24
+                    ).label('hours')
                 )
-                self.db.merge(metrics)
-            self.db.commit()
+                .group_by(BlockedPeriod.issue_id)
+                .subquery()
+            )
+
+            metrics = (
+                select(
+                    Cycle.id,
+                    func.coalesce(func.sum(points), 0),
+                    completed_points,
+                    func.coalesce(func.avg(case(
+                        (completed & Issue.started_at.isnot(None),
+                         (func.julianday(Issue.completed_at) - func.julianday(Issue.started_at)) * 24)
+                    )), 0),
+                    func.coalesce(func.avg(case((completed, Issue.completion_hours))), 0),
+                    func.count(Issue.completed_at),
+                    completed_points,
+                    func.coalesce(func.avg(case((completed, func.coalesce(blocked.c.hours, 0)))), 0),
+                    Cycle.start_date,
+                    Cycle.end_date,
+                    Cycle.team_id,
+                    Cycle.team_name,
+                )
+                .select_from(Cycle)
+                .outerjoin(Issue, Issue.cycle_id == Cycle.id)
+                .outerjoin(blocked, blocked.c.issue_id == Issue.id)
+                .group_by(Cycle.id)
+            )
+
+            stmt = sqlite_insert(CycleMetrics.__table__).from_select(
+                ['cycle_id', 'total_story_points', 'completed_story_points', 'avg_cycle_time',
+                 'avg_lead_time', 'throughput', 'velocity', 'avg_blocked_time',
+                 'start_date', 'end_date', 'team_id', 'team_name'],
+                metrics
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['cycle_id'],
+                set_={c: stmt.excluded[c] for c in (
+                    'total_story_points', 'completed_story_points', 'avg_cycle_time',
+                    'avg_lead_time', 'throughput', 'velocity', 'avg_blocked_time',
+                    'start_date', 'end_date', 'team_id', 'team_name')}
+            )
+            self.db.execute(stmt)
         except Exception as e:
             print(f"Error calculating cycle metrics: {str(e)}")
             raise
@@ -416,81 +818,89 @@ class LinearMetricsClient:
     def _calculate_user_metrics(self):
         """Calculate comprehensive metrics for each user"""
         try:
-            users = self.db.query(User).all()
-            cycles = self.db.query(Cycle).all()
-            
-            for user in users:
-                for cycle in cycles:
-                    user_issues = [i for i in cycle.issues if i.assignee_id == user.id]
-                    completed_issues = [i for i in user_issues if i.completed_at]
-                    
-                    if not completed_issues:
-                        continue
-                    
-                    points_completed = sum(i.estimate or 0 for i in completed_issues)
-                    cycle_times = []
-                    
-                    for issue in completed_issues:
-                        if issue.started_at and issue.completed_at:
-                            cycle_times.append((issue.completed_at - issue.started_at).total_seconds() / 3600)
-                    
-                    metrics = UserMetrics(
-                        user_id=user.id,
-                        cycle_id=cycle.id,
-                        story_points_completed=points_completed,
-                        avg_cycle_time=sum(cycle_times) / len(cycle_times) if cycle_times else 0,
-                        velocity=points_completed,
-                        capacity_utilization=0.0,  # Default since we don't have capacity data
-                        efficiency_ratio=1.0  # Default since we don't have ideal/actual hours
-                    )
-                    self.db.merge(metrics)
-            self.db.commit()
+            points = func.coalesce(func.sum(func.coalesce(Issue.estimate, 0)), 0)
+            metrics = (
+                select(
+                    Issue.assignee_id,
+                    Issue.cycle_id,
+                    points,
+                    func.coalesce(func.avg(case(
+                        (Issue.started_at.isnot(None),
+                         (func.julianday(Issue.completed_at) - func.julianday(Issue.started_at)) * 24)
+                    )), 0),
+                    points,
+                    literal(0.0),  # Default since we don't have capacity data
+                    literal(1.0),  # Default since we don't have ideal/actual hours
+                )
+                .join(User, User.id == Issue.assignee_id)
+                .join(Cycle, Cycle.id == Issue.cycle_id)
+                .where(Issue.completed_at.isnot(None))
+                .group_by(Issue.assignee_id, Issue.cycle_id)
+            )
+
+            stmt = sqlite_insert(UserMetrics.__table__).from_select(
+                ['user_id', 'cycle_id', 'story_points_completed', 'avg_cycle_time',
+                 'velocity', 'capacity_utilization', 'efficiency_ratio'],
+                metrics
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'cycle_id'],
+                set_={c: stmt.excluded[c] for c in (
+                    'story_points_completed', 'avg_cycle_time', 'velocity',
+                    'capacity_utilization', 'efficiency_ratio')}
+            )
+            self.db.execute(stmt)
         except Exception as e:
             print(f"Error calculating user metrics: {str(e)}")
             raise
 
+    def _columns_df(self, *columns) -> pd.DataFrame:
+        """Read the given model columns straight into a DataFrame"""
+        return pd.read_sql_query(
+            select(*columns),
+            self.db.get_bind(),
+            parse_dates=[column.key for column in columns if isinstance(column.type, DateTime)]
+        )
+
     def get_cycle_metrics_df(self) -> pd.DataFrame:
         """Return cycle metrics as a pandas DataFrame"""
-        metrics = self.db.query(CycleMetrics).all()
-        return pd.DataFrame([{
-            'cycle_id': m.cycle_id,
-            'total_story_points': m.total_story_points,
-            'completed_story_points': m.completed_story_points,
-            'avg_cycle_time': m.avg_cycle_time,
-            'avg_lead_time': m.avg_lead_time,
-            'throughput': m.throughput,
-            'velocity': m.velocity,
-            'avg_blocked_time': m.avg_blocked_time,
-            'start_date': m.start_date,
-            'end_date': m.end_date,
-            'team_id': m.team_id,
-            'team_name': m.team_name,
-            'project_id': m.project_id,
-            'project_name': m.project_name,
-            'initiative': m.initiative
-        } for m in metrics])
+        return self._columns_df(
+            CycleMetrics.cycle_id,
+            CycleMetrics.total_story_points,
+            CycleMetrics.completed_story_points,
+            CycleMetrics.avg_cycle_time,
+            CycleMetrics.avg_lead_time,
+            CycleMetrics.throughput,
+            CycleMetrics.velocity,
+            CycleMetrics.avg_blocked_time,
+            CycleMetrics.start_date,
+            CycleMetrics.end_date,
+            CycleMetrics.team_id,
+            CycleMetrics.team_name,
+            CycleMetrics.project_id,
+            CycleMetrics.project_name,
+            CycleMetrics.initiative
+        )
 
     def get_user_metrics_df(self) -> pd.DataFrame:
         """Return user metrics as a pandas DataFrame"""
-        metrics = self.db.query(UserMetrics).all()
-        return pd.DataFrame([{
-            'user_id': m.user_id,
-            'cycle_id': m.cycle_id,
-            'story_points_completed': m.story_points_completed,
-            'avg_cycle_time': m.avg_cycle_time,
-            'velocity': m.velocity,
-            'capacity_utilization': m.capacity_utilization,
-            'efficiency_ratio': m.efficiency_ratio
-        } for m in metrics])
+        return self._columns_df(
+            UserMetrics.user_id,
+            UserMetrics.cycle_id,
+            UserMetrics.story_points_completed,
+            UserMetrics.avg_cycle_time,
+            UserMetrics.velocity,
+            UserMetrics.capacity_utilization,
+            UserMetrics.efficiency_ratio
+        )
 
     def get_daily_metrics_df(self) -> pd.DataFrame:
         """Return daily metrics as a pandas DataFrame"""
-        metrics = self.db.query(DailyMetrics).all()
-        return pd.DataFrame([{
-            'cycle_id': m.cycle_id,
-            'date': m.date,
-            'remaining_hours': m.remaining_hours,
-            'completed_points': m.completed_points,
-            'wip_count': m.wip_count,
-            'blocked_items': m.blocked_items
-        } for m in metrics])
+        return self._columns_df(
+            DailyMetrics.cycle_id,
+            DailyMetrics.date,
+            DailyMetrics.remaining_hours,
+            DailyMetrics.completed_points,
+            DailyMetrics.wip_count,
+            DailyMetrics.blocked_items
+        )
@@ -7,14 +7,11 @@ import os
 def sync_data():
     """Initialize database and sync data from Linear"""
     print("Initializing database...")
-    db = init_db(force_recreate=True)  # Force recreate DB to apply schema changes
+    db = init_db()  # Keep the DB between runs so issue syncs are incremental
     
-    print("Testing Linear API connection...")
     client = LinearMetricsClient()
-    if not client.test_connection():
-        print("Failed to connect to Linear API. Please check your API key and try again.")
-        sys.exit(1)
     
+    # The connection is checked by the sync's first request
     print("Syncing data from Linear...")
     try:
         client.sync_data()